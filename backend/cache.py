@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import sqlite3
+import time
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "chatdb")
+
+
+def _to_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+class SchemaCache:
+    """Persistent per-database cache for the schema snapshot, column samples and NL index.
+
+    Everything is stored in a small SQLite file next to the other cache files. All entries
+    are tied to a schema fingerprint and are dropped as soon as the fingerprint changes.
+    Entries derived from row data (column samples) are additionally tied to a per-table
+    data stamp and a TTL, see get_data/set_data.
+    """
+
+    def __init__(self, host, database, cache_dir=None):
+        cache_dir = cache_dir or os.environ.get("CHATDB_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.path = os.path.join(cache_dir, f"{host}_{database}.sqlite")
+        self.fingerprint = None
+        self.data_stamps = {}
+        self.conn = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=5)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA mmap_size=268435456")  # Serve reads from a memory map
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT)")
+            self.conn.commit()
+        except (OSError, sqlite3.Error) as err:
+            print(f"Schema cache disabled: {err}")
+            self.conn = None
+
+    @staticmethod
+    def compute_fingerprint(cursor, database):
+        """Hashes the column layout and the primary/foreign keys of every table."""
+        digest = hashlib.sha1()
+        queries = [
+            "SELECT table_name, column_name, column_type FROM information_schema.columns "
+            "WHERE table_schema = %s ORDER BY table_name, ordinal_position",
+            "SELECT table_name, constraint_name, column_name, referenced_table_name, referenced_column_name "
+            "FROM information_schema.key_column_usage "
+            "WHERE table_schema = %s ORDER BY table_name, constraint_name, ordinal_position",
+        ]
+        for query in queries:
+            cursor.execute(query, (database,))
+            for row in cursor.fetchall():
+                digest.update("|".join(_to_str(value) for value in row).encode('utf-8'))
+                digest.update(b"\n")
+            digest.update(b"--\n")
+        return digest.hexdigest()
+
+    @staticmethod
+    def compute_data_stamps(cursor, database):
+        """Returns a per-table stamp (update time and row estimate) that changes with the table's data."""
+        cursor.execute(
+            "SELECT table_name, update_time, table_rows FROM information_schema.tables WHERE table_schema = %s",
+            (database,)
+        )
+        return {_to_str(table): f"{_to_str(update_time)}|{_to_str(table_rows)}" for table, update_time, table_rows in cursor.fetchall()}
+
+    def validate(self, fingerprint, data_stamps=None):
+        """Keeps the cached entries if they match the fingerprint, otherwise clears them."""
+        self.fingerprint = fingerprint
+        self.data_stamps = data_stamps or {}
+        if self.conn is None:
+            return False
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row and row[0] == fingerprint:
+                return True
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+            self.conn.commit()
+        except sqlite3.Error as err:
+            print(f"Schema cache error: {err}")
+        return False
+
+    def get(self, key):
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as err:
+            print(f"Schema cache error: {err}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, default=str))
+            )
+            self.conn.commit()
+        except sqlite3.Error as err:
+            print(f"Schema cache error: {err}")
+
+    def get_data(self, key, table, ttl):
+        """Like get, for entries derived from row data: misses when the table's data stamp changed or ttl expired."""
+        entry = self.get(key)
+        if entry is None or entry["stamp"] != self.data_stamps.get(table) or time.time() - entry["cached_at"] > ttl:
+            return None
+        return entry["value"]
+
+    def set_data(self, key, table, value):
+        self.set(key, {"stamp": self.data_stamps.get(table), "cached_at": time.time(), "value": value})
+
+    def invalidate(self):
+        """Drops all cached entries, e.g. after the schema or data was modified by ChatDB itself."""
+        self.fingerprint = None
+        self.data_stamps = {}
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.commit()
+        except sqlite3.Error as err:
+            print(f"Schema cache error: {err}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
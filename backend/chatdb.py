@@ -1,6 +1,21 @@
 import mysql.connector
+from mysql.connector import errorcode
 import re
 import random
+import time
+from cache import SchemaCache
+from querylog import SlowQueryLog
+
+# Number of random values kept per column for sample query generation
+SAMPLE_CACHE_SIZE = 100
+# Rows per executemany() call when bulk-loading. mysql-connector sends each call as one
+# multi-row INSERT, which has to stay below max_allowed_packet (4 MB by default on older servers)
+INSERT_BATCH_ROWS = 1000
+# Cached sample values are also refreshed after this many seconds, since MySQL may report
+# information_schema.tables.UPDATE_TIME/TABLE_ROWS from its own (stale) statistics cache
+SAMPLE_CACHE_TTL = 600
+
+READ_ONLY_QUERY = re.compile(r'\s*(SELECT|SHOW|DESCRIBE|DESC|EXPLAIN|WITH)\b', re.IGNORECASE)
 
 class ChatDB:
     @classmethod
@@ -31,42 +46,76 @@ class ChatDB:
             return []
         
 
-    def __init__(self, host, user, password, database):
-        # Connect to MySQL server without specifying a database
-        conn = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-        )
-        cursor = conn.cursor()
-
-        # Check if the database exists, create if not
-        cursor.execute(f"SHOW DATABASES LIKE '{database}';")
-        result = cursor.fetchone()
-
-        if result:
+    def __init__(self, host, user, password, database, cache=True, cache_dir=None,
+                 slow_query_ms=None, slow_query_log=None, explain_analyze=False, create=True):
+        """Connects to `database`, creating it first if it is missing (pass create=False to raise instead)."""
+        self.database = database
+        try:
+            # Connect straight to the database; only fall back to creating it if it is missing
+            self.conn = mysql.connector.connect(
+                host=host,
+                user=user,
+                password=password,
+                database=database
+            )
             print(f"Database '{database}' already exists.")
-        else:
+        except mysql.connector.Error as err:
+            if err.errno != errorcode.ER_BAD_DB_ERROR or not create:
+                raise
+            # Connect to MySQL server without specifying a database
+            conn = mysql.connector.connect(
+                host=host,
+                user=user,
+                password=password,
+            )
+            cursor = conn.cursor()
             print(f"Database '{database}' does not exist. Creating it now.")
             cursor.execute(f"CREATE DATABASE {database};")
             print(f"Database '{database}' created successfully.")
+            cursor.close()
+            conn.close()
 
-        # cursor.close()
-        conn.close()
-
-        # Now connect to the newly created or existing database
-        self.conn = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+            # Now connect to the newly created database
+            self.conn = mysql.connector.connect(
+                host=host,
+                user=user,
+                password=password,
+                database=database
+            )
         self.cursor = self.conn.cursor()
 
+        # Persistent schema/sample cache, validated against the current schema fingerprint on first use
+        self.cache = SchemaCache(host, database, cache_dir) if cache else None
+
+        # Optional plan capture for queries slower than slow_query_ms
+        self.query_log = None
+        if slow_query_ms is not None:
+            self.query_log = SlowQueryLog(slow_query_ms, slow_query_log, explain_analyze)
+
+    def _get_cache(self):
+        """Returns the schema cache once it has been validated for this session, or None."""
+        if self.cache is None:
+            return None
+        if self.cache.fingerprint is None:
+            try:
+                self.cache.validate(
+                    SchemaCache.compute_fingerprint(self.cursor, self.database),
+                    SchemaCache.compute_data_stamps(self.cursor, self.database)
+                )
+            except mysql.connector.Error as err:
+                print(f"Error: {err}")
+                return None
+        return self.cache
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
     def create_table(self, create_table_sql):
         try:
             self.cursor.execute(create_table_sql)
             self.conn.commit()
+            self._invalidate_cache()
             return {"message": "Table created successfully."}
         except mysql.connector.Error as err:
             self.conn.rollback()
@@ -90,11 +139,48 @@ class ChatDB:
                 self.cursor.execute(insert_query, tuple(row))
 
             self.conn.commit()
+            self._invalidate_cache()
             return {"message": f"Data imported successfully into {table_name}."}
         except mysql.connector.Error as err:
             self.conn.rollback()
             return {"error": str(err)}
         
+    def create_table_and_insert_batches(self, table_name, headers, batches):
+        """Creates a table and bulk-loads row batches into it (used for large CSV uploads).
+
+        All rows are committed in one transaction, so a failing batch rolls back the whole import.
+        """
+        print(f"Table name to be created: {table_name}")
+        columns = [header.replace(' ', '_') for header in headers]
+        create_table_query = f"CREATE TABLE IF NOT EXISTS `{table_name}` ({', '.join([f'`{column}` VARCHAR(255)' for column in columns])});"
+        response = self.create_table(create_table_query)
+        if "error" in response:
+            return response
+
+        placeholders = ", ".join(["%s"] * len(columns))
+        insert_query = f"INSERT INTO `{table_name}` ({', '.join([f'`{column}`' for column in columns])}) VALUES ({placeholders})"
+        total_rows = 0
+        try:
+            for batch in batches:
+                rows = [tuple(row) for row in batch if row]  # Skip blank lines
+                for start in range(0, len(rows), INSERT_BATCH_ROWS):
+                    self.cursor.executemany(insert_query, rows[start:start + INSERT_BATCH_ROWS])
+                if rows:
+                    total_rows += len(rows)
+                    print(f"Inserted {total_rows} rows into {table_name}")
+            self.conn.commit()
+            self._invalidate_cache()
+            return {"message": f"Data imported successfully into {table_name}.", "rows": total_rows}
+        except mysql.connector.Error as err:
+            self.conn.rollback()
+            self._invalidate_cache()
+            return {"error": str(err)}
+        except Exception as e:
+            # Batches may be parsed lazily, so decoding/CSV errors surface here
+            self.conn.rollback()
+            self._invalidate_cache()
+            return {"error": f"Error reading data for {table_name}: {e}"}
+
     def get_all_tables(self):
         try:
             self.cursor.execute("SHOW TABLES")
@@ -112,18 +198,58 @@ class ChatDB:
             print(f"Error: {err}")
             return []
 
-    def execute_custom_query(self, query, params=None):
-        """Executes a custom SQL query and returns the result."""
+    def get_nl_index(self):
+        """Returns the table -> columns map used for natural language matching."""
+        cache = self._get_cache()
+        if cache is not None:
+            nl_index = cache.get("nl_index")
+            if nl_index is not None:
+                return nl_index
+
+        nl_index = {table: self.get_table_columns(table) for table in self.get_all_tables()}
+        if cache is not None:
+            cache.set("nl_index", nl_index)
+        return nl_index
+
+    def execute_custom_query(self, query, params=None, source="user"):
+        """Executes a custom SQL query and returns the result.
+
+        source names the feature the query came from ("user", "nl" or "sample") in the slow query log.
+        """
+        if not READ_ONLY_QUERY.match(query):
+            # Statements that may change schema or data make the cached snapshot stale
+            self._invalidate_cache()
         try:
             print(f"Executing custom SQL query: {query} with params: {params}")  # Print the SQL query being executed
+            started = time.perf_counter()
             self.cursor.execute(query, params)
+            if not self.cursor.with_rows:
+                # DML/DDL: there is no result set, so commit and report the affected rows
+                rowcount = self.cursor.rowcount
+                self.conn.commit()
+                duration_ms = (time.perf_counter() - started) * 1000
+                if self.query_log is not None and duration_ms >= self.query_log.threshold_ms:
+                    # No plan: EXPLAIN ANALYZE would execute the statement a second time
+                    self.query_log.record(self.database, source, query, duration_ms)
+                return {"rowcount": rowcount}
             results = self.cursor.fetchall()
+            duration_ms = (time.perf_counter() - started) * 1000
             columns = [desc[0] for desc in self.cursor.description]
             data = [dict(zip(columns, row)) for row in results]
+            if self.query_log is not None and duration_ms >= self.query_log.threshold_ms:
+                self._log_slow_query(query, params, source, duration_ms)
             return {"data": data}
         except mysql.connector.Error as err:
             return {"error": str(err)}
 
+    def _log_slow_query(self, query, params, source, duration_ms):
+        try:
+            plan, rows_examined = self.query_log.capture_plan(self.cursor, query, params)
+        except (mysql.connector.Error, ValueError) as err:
+            print(f"Error capturing query plan: {err}")
+            plan, rows_examined = None, None
+        self.query_log.record(self.database, source, query, duration_ms, plan, rows_examined)
+
     def get_table_info_and_sample_data(self, table_name, sample_size=5):
         try:
             cursor = self.cursor
@@ -148,7 +274,12 @@ class ChatDB:
             return None
 
     def get_schema_info(self, database):
-        
+        cache = self._get_cache() if database == self.database else None
+        if cache is not None:
+            schema = cache.get("schema_info")
+            if schema is not None:
+                return schema
+
         cursor = self.cursor
         # print("here")
 
@@ -191,10 +322,18 @@ class ChatDB:
             ]
 
         # cursor.close()
+        if cache is not None:
+            cache.set("schema_info", schema)
         return schema
 
 
     def get_table_info(self):
+        cache = self._get_cache()
+        if cache is not None:
+            table_info = cache.get("table_info")
+            if table_info is not None:
+                return table_info
+
         try:
             self.cursor.execute("SHOW TABLES")
             tables = [table[0] for table in self.cursor.fetchall()]
@@ -222,11 +361,29 @@ class ChatDB:
                     'categorical_columns': categorical_cols
                 }
             
+            if cache is not None:
+                cache.set("table_info", table_info)
             return table_info
         except mysql.connector.Error as err:
             print(f"Error: {err}")
             return {}
         
+    def _sample_values(self, table, col, distinct=False):
+        """Returns random candidate values of a column, served from the cache when available."""
+        select = "SELECT DISTINCT" if distinct else "SELECT"
+        cache = self._get_cache()
+        if cache is None:
+            self.cursor.execute(f"{select} {col} FROM {table} ORDER BY RAND() LIMIT 1")
+            return [row[0] for row in self.cursor.fetchall()]
+
+        key = f"samples:{'distinct:' if distinct else ''}{table}.{col}"
+        values = cache.get_data(key, table, SAMPLE_CACHE_TTL)
+        if values is None:
+            self.cursor.execute(f"{select} {col} FROM {table} ORDER BY RAND() LIMIT {SAMPLE_CACHE_SIZE}")
+            values = [row[0] for row in self.cursor.fetchall()]
+            cache.set_data(key, table, values)
+        return values
+
     def generate_query_templates(self):
         table_info = self.get_table_info()
         templates = []
@@ -312,9 +469,8 @@ class ChatDB:
                         if placeholder.startswith('numeric'):
                             if info['numeric_columns']:
                                 col = random.choice(info['numeric_columns'])
-                                self.cursor.execute(f"SELECT {col} FROM {table} ORDER BY RAND() LIMIT 1")
-                                result = self.cursor.fetchone()
-                                value = result[0] if result else 0
+                                values = self._sample_values(table, col)
+                                value = random.choice(values) if values else 0
                                 query = query.replace(f"{{{placeholder}}}", str(value))
                             else:
                                 # If no numeric columns, replace with a default value
@@ -322,9 +478,8 @@ class ChatDB:
                         elif placeholder.startswith('categorical'):
                             if info['categorical_columns']:
                                 col = random.choice(info['categorical_columns'])
-                                self.cursor.execute(f"SELECT DISTINCT {col} FROM {table} ORDER BY RAND() LIMIT 1")
-                                result = self.cursor.fetchone()
-                                value = result[0] if result else ''
+                                values = self._sample_values(table, col, distinct=True)
+                                value = random.choice(values) if values else ''
                                 query = query.replace(f"{{{placeholder}}}", f"'{value}'")
                             else:
                                 # If no categorical columns, replace with a default value
@@ -333,9 +488,8 @@ class ChatDB:
                             date_cols = [col for col in info['categorical_columns'] if 'date' in col.lower() or 'year' in col.lower()]
                             if date_cols:
                                 col = random.choice(date_cols)
-                                self.cursor.execute(f"SELECT {col} FROM {table} ORDER BY RAND() LIMIT 1")
-                                result = self.cursor.fetchone()
-                                value = result[0] if result else '2000-01-01'
+                                values = self._sample_values(table, col)
+                                value = random.choice(values) if values else '2000-01-01'
                                 query = query.replace(f"{{{placeholder}}}", f"'{value}'")
                             else:
                                 # If no date columns, replace with a default value
@@ -343,9 +497,8 @@ class ChatDB:
                         elif placeholder == 'like_pattern':
                             if info['categorical_columns']:
                                 col = random.choice(info['categorical_columns'])
-                                self.cursor.execute(f"SELECT {col} FROM {table} ORDER BY RAND() LIMIT 1")
-                                result = self.cursor.fetchone()
-                                value = result[0] if result else ''
+                                values = self._sample_values(table, col)
+                                value = random.choice(values) if values else ''
                                 pattern = f"%{value[:3]}%" if value else '%'
                                 query = query.replace(f"{{{placeholder}}}", f"'{pattern}'")
                             else:
@@ -367,3 +520,7 @@ class ChatDB:
     def close(self):
         self.cursor.close()
         self.conn.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.query_log is not None:
+            self.query_log.close()
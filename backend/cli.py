@@ -9,8 +9,23 @@
 import os
 import sys
 import re
+import json
+import argparse
+from contextlib import redirect_stdout
+from mysql.connector import errorcode
 from chatdb import ChatDB
-from utils import parse_excel, parse_csv, generate_description, natural_language_to_sql  # Import necessary functions
+from config import load_config
+from querylog import SlowQueryLog
+from utils import parse_excel, parse_csv_parallel, generate_description, natural_language_to_sql  # Import necessary functions
+
+
+def connect(config, database, create=True):
+    return ChatDB(
+        config["host"], config["user"], config["password"], database,
+        slow_query_ms=config["slow_query_ms"],
+        explain_analyze=config["explain_analyze"],
+        create=create
+    )
 
 
 def create_table_and_import_data(db, sheets):
@@ -36,10 +51,10 @@ def upload_data(db):
         else:
             print("Failed to parse Excel file.")
     elif file_path.endswith(".csv"):
-        headers, data = parse_csv(file_path)
-        if headers and data:
+        headers, batches = parse_csv_parallel(file_path)
+        if headers:
             table_name = os.path.splitext(os.path.basename(file_path))[0]  # Extract filename without extension
-            response = db.create_table_and_insert_data(table_name, headers, data)
+            response = db.create_table_and_insert_batches(table_name, headers, batches)
             print(response)
         else:
             print("Failed to parse CSV file.")
@@ -69,16 +84,24 @@ def display_table_info(db, table_name):
         print(f"Unable to retrieve information for table {table_name}")
 
 
-def main():
-    host = "localhost"
-    user = "root"
-    password = "root"
+def interactive(config):
+    host = config["host"]
+    user = config["user"]
+    password = config["password"]
     db = None
 
     print("Welcome to ChatDB! I'm your AI assistant for database operations.")
     print("You can ask me to create a new database, use an existing one, upload data, generate queries, and more.")
 
+    # Preselect the database from --database, the config file or CHATDB_DATABASE
     current_database = None
+    if config["database"]:
+        try:
+            db = connect(config, config["database"], create=False)
+            current_database = config["database"]
+            print(f"Now using database: {current_database}")
+        except Exception as e:
+            print(f"Could not use database '{config['database']}': {e}")
 
     while True:
         user_input = input("\nYou: ").strip().lower()
@@ -89,7 +112,7 @@ def main():
 
         if "create" in user_input or "new database" in user_input or "upload data" in user_input:
             database_name = input("What would you like to name your new database? ")
-            db = ChatDB(host, user, password, database_name)
+            db = connect(config, database_name)
             current_database = database_name
             print(f"Great! I've created a new database called '{database_name}'. Now, let's upload some data.")
             upload_data(db)
@@ -109,7 +132,7 @@ def main():
                 print("I'm sorry, that's not a valid choice. Please try again.")
                 continue
             print(f"Now using database: {current_database}")
-            db = ChatDB(host, user, password, current_database)
+            db = connect(config, current_database)
 
         elif re.search(r'\b(show|display|view)\s+(tables?|schema)\b', user_input):
             if not current_database:
@@ -153,7 +176,7 @@ def main():
                         for i, query in enumerate(sample_queries, 1):
                             print(f"\nExecuting Query {i}:")
                             print(f"SQL: {query}")
-                            result = db.execute_custom_query(query)
+                            result = db.execute_custom_query(query, source="sample")
                             if "error" in result:
                                 print(f"Error executing query: {result['error']}")
                             else:
@@ -165,7 +188,7 @@ def main():
                         query_to_execute = sample_queries[query_index]
                         print(f"\nExecuting Query {execute_option}:")
                         print(f"SQL: {query_to_execute}")
-                        result = db.execute_custom_query(query_to_execute)
+                        result = db.execute_custom_query(query_to_execute, source="sample")
                         if "error" in result:
                             print(f"Error executing query: {result['error']}")
                         else:
@@ -193,7 +216,7 @@ def main():
                 if execute_option == 'yes':
                     query_to_execute = sample_queries[0]  # There's only one query when using a specific construct
                     print(f"Executing query: {query_to_execute}")
-                    result = db.execute_custom_query(query_to_execute)
+                    result = db.execute_custom_query(query_to_execute, source="sample")
                     if "error" in result:
                         print(f"Error executing query: {result['error']}")
                     else:
@@ -212,7 +235,7 @@ def main():
                 
                 execute_option = input("Would you like to execute this query? (yes/no): ").strip().lower()
                 if execute_option == 'yes':
-                    result = db.execute_custom_query(sql_query)
+                    result = db.execute_custom_query(sql_query, source="nl")
                     if "error" in result:
                         print(f"Error executing query: {result['error']}")
                     else:
@@ -230,5 +253,198 @@ def main():
 
     # db.close()
 
+
+# Scripted (non-interactive) commands. Each returns a JSON-serialisable dict;
+# a top-level "error" key marks the command as failed.
+
+def cmd_upload(db, args):
+    file_path = args.file
+    if not os.path.isfile(file_path):
+        return {"error": f"File not found: {file_path}"}
+
+    results = {}
+    if file_path.endswith(".xlsx"):
+        sheets = parse_excel(file_path)
+        if not sheets:
+            return {"error": "Failed to parse Excel file."}
+        for sheet_name, dataframe in sheets.items():
+            results[sheet_name] = db.create_table_and_insert_data(sheet_name, dataframe.columns.tolist(), dataframe.values.tolist())
+    elif file_path.endswith(".csv"):
+        headers, batches = parse_csv_parallel(file_path, workers=args.workers)
+        if not headers:
+            return {"error": "Failed to parse CSV file."}
+        table_name = args.table or os.path.splitext(os.path.basename(file_path))[0]
+        results[table_name] = db.create_table_and_insert_batches(table_name, headers, batches)
+    else:
+        return {"error": "Unsupported file type. Only .xlsx and .csv files are supported."}
+
+    payload = {"tables": results}
+    errors = [result["error"] for result in results.values() if "error" in result]
+    if errors:
+        payload["error"] = "; ".join(errors)
+    return payload
+
+
+def cmd_nl2sql(db, args):
+    sql_query = natural_language_to_sql(db, args.question)
+    if sql_query.startswith("Sorry"):
+        return {"error": sql_query}
+    payload = {"sql": sql_query}
+    if args.execute:
+        payload.update(db.execute_custom_query(sql_query, source="nl"))
+    return payload
+
+
+def cmd_sample(db, args):
+    queries = []
+    for query in db.generate_sample_queries(num_queries=args.count, construct=args.construct):
+        entry = {"sql": query, "description": generate_description(query)}
+        if args.execute:
+            entry["result"] = db.execute_custom_query(query, source="sample")
+        queries.append(entry)
+    return {"queries": queries}
+
+
+def cmd_exec(db, args):
+    query = sys.stdin.read() if args.sql == "-" else args.sql
+    return db.execute_custom_query(query)
+
+
+def cmd_schema(db, args):
+    if not args.table:
+        return db.get_schema_info(db.database)
+
+    table_info = db.get_table_info_and_sample_data(args.table)
+    if not table_info:
+        return {"error": f"Unable to retrieve information for table {args.table}"}
+    headers = [desc[0] for desc in db.cursor.description]
+    return {
+        "table_name": table_info["table_name"],
+        "columns": [
+            {"Field": column[0], "Type": column[1].decode('utf-8') if isinstance(column[1], bytes) else column[1]}
+            for column in table_info["structure"]
+        ],
+        "sample_data": [dict(zip(headers, row)) for row in table_info["sample_data"]]
+    }
+
+
+COMMANDS = {
+    "upload": cmd_upload,
+    "nl2sql": cmd_nl2sql,
+    "sample": cmd_sample,
+    "exec": cmd_exec,
+    "schema": cmd_schema,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="ChatDB command-line interface. Run without a command for the interactive chat."
+    )
+    parser.add_argument("--config", help="JSON config file with host/user/password/database (default: $CHATDB_CONFIG)")
+    parser.add_argument("--host", help="MySQL host (overrides config and $CHATDB_HOST)")
+    parser.add_argument("--user", help="MySQL user (overrides config and $CHATDB_USER)")
+    parser.add_argument("--database", "-d", help="Database to use (overrides config and $CHATDB_DATABASE); preselected in the interactive chat")
+    subparsers = parser.add_subparsers(dest="command")
+
+    upload = subparsers.add_parser("upload", help="Upload a CSV or Excel file")
+    upload.add_argument("file")
+    upload.add_argument("--table", help="Table name for CSV files (default: file name)")
+    upload.add_argument("--workers", type=int, help="CSV parser processes (default: number of CPUs)")
+
+    nl2sql = subparsers.add_parser("nl2sql", help="Translate a natural language question to SQL")
+    nl2sql.add_argument("question")
+    nl2sql.add_argument("--execute", action="store_true", help="Also execute the generated query")
+
+    sample = subparsers.add_parser("sample", help="Generate sample queries")
+    sample.add_argument("--count", type=int, default=5)
+    sample.add_argument("--construct", help="Only use templates containing this SQL construct")
+    sample.add_argument("--execute", action="store_true", help="Also execute the generated queries")
+
+    exec_ = subparsers.add_parser("exec", help="Execute a SQL query")
+    exec_.add_argument("sql", help="SQL query, or '-' to read it from stdin")
+
+    schema = subparsers.add_parser("schema", help="Show the database schema")
+    schema.add_argument("--table", help="Show structure and sample rows of a single table")
+
+    slowlog = subparsers.add_parser("slowlog", help="Report slow queries aggregated by fingerprint")
+    slowlog.add_argument("--limit", type=int, default=20)
+    slowlog.add_argument("--log", help="Slow query log file (default: $CHATDB_SLOW_QUERY_LOG or ~/.cache/chatdb)")
+    slowlog.add_argument("--format", choices=["json", "text"], default="json")
+
+    return parser
+
+
+def run_slowlog(args):
+    """Prints the slow query report; filtered by database only when one is given explicitly."""
+    query_log = SlowQueryLog(path=args.log)
+    report = query_log.report(limit=args.limit, database=args.database)
+    query_log.close()
+
+    if args.format == "json":
+        print(json.dumps(report))
+        return 0
+
+    row_format = "{:>6}  {:>10}  {:>9}  {:>9}  {:>12}  {:<12}  {}"
+    print(row_format.format("count", "total_ms", "avg_ms", "max_ms", "rows_exam", "sources", "fingerprint"))
+    for entry in report:
+        print(row_format.format(
+            entry["count"], entry["total_ms"], entry["avg_ms"], entry["max_ms"],
+            "-" if entry["avg_rows_examined"] is None else entry["avg_rows_examined"],
+            ",".join(entry["sources"]), entry["fingerprint"]
+        ))
+    return 0
+
+
+def run_command(args, config):
+    """Runs a scripted command and prints its result as a single JSON document."""
+    database = args.database or config["database"]
+    if not database:
+        print(json.dumps({"error": "No database given. Use --database, the config file or CHATDB_DATABASE."}))
+        return 2
+
+    # Keep stdout machine-readable: ChatDB's progress messages go to stderr instead
+    exit_code = 0
+    with redirect_stdout(sys.stderr):
+        try:
+            # Only uploads may create the database; a typo elsewhere should not create one
+            db = connect(config, database, create=args.command == "upload")
+            try:
+                result = COMMANDS[args.command](db, args)
+            finally:
+                db.close()
+        except Exception as e:
+            result = {"error": str(e)}
+            if getattr(e, "errno", None) == errorcode.ER_BAD_DB_ERROR:
+                exit_code = 2
+
+    print(json.dumps(result, default=str))
+    if exit_code == 0 and "error" in result:
+        exit_code = 1
+    return exit_code
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        # Missing/invalid config file or a malformed CHATDB_* value
+        print(json.dumps({"error": f"Invalid configuration: {e}"}))
+        return 1
+    if args.host:
+        config["host"] = args.host
+    if args.user:
+        config["user"] = args.user
+    if args.database:
+        config["database"] = args.database
+
+    if args.command is None:
+        interactive(config)
+        return 0
+    if args.command == "slowlog":
+        return run_slowlog(args)
+    return run_command(args, config)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
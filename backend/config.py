@@ -0,0 +1,47 @@
+import os
+import json
+
+
+# No built-in credentials: user and password come only from the config file or env vars
+DEFAULTS = {
+    "host": "localhost",
+    "user": "",
+    "password": "",
+    "database": None,
+    "slow_query_ms": None,
+    "explain_analyze": False,
+}
+
+# Environment variables override values from the config file
+ENV_VARS = {
+    "host": "CHATDB_HOST",
+    "user": "CHATDB_USER",
+    "password": "CHATDB_PASSWORD",
+    "database": "CHATDB_DATABASE",
+    "slow_query_ms": "CHATDB_SLOW_QUERY_MS",
+    "explain_analyze": "CHATDB_EXPLAIN_ANALYZE",
+}
+
+
+def load_config(path=None):
+    """Loads connection settings from defaults, an optional JSON file and CHATDB_* env vars."""
+    config = dict(DEFAULTS)
+
+    path = path or os.environ.get("CHATDB_CONFIG")
+    if path:
+        with open(path) as file:
+            values = json.load(file)
+        if not isinstance(values, dict):
+            raise ValueError(f"{path} must contain a JSON object")
+        config.update({key: value for key, value in values.items() if key in DEFAULTS})
+
+    for key, env_var in ENV_VARS.items():
+        if env_var in os.environ:
+            config[key] = os.environ[env_var]
+
+    if config["slow_query_ms"] is not None:
+        config["slow_query_ms"] = float(config["slow_query_ms"])
+    if isinstance(config["explain_analyze"], str):
+        config["explain_analyze"] = config["explain_analyze"].lower() in ("1", "true", "yes")
+
+    return config
@@ -0,0 +1,298 @@
+# loadtest.py
+# Replays recorded or synthetic ChatDB workloads with N concurrent simulated users.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from contextlib import redirect_stdout
+from chatdb import ChatDB
+from config import load_config
+from utils import natural_language_to_sql
+
+
+DEFAULT_MIX = {"nl": 0.4, "sample": 0.3, "exec": 0.25, "upload": 0.05}
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def load_workload(path):
+    """Loads a recorded workload: one JSON operation per line, e.g. {"op": "exec", "sql": "..."}."""
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def synthetic_workload(table_info, mix, size=200, seed=None):
+    """Builds a random mix of NL questions, sample generation, uploads and custom queries from the schema."""
+    rng = random.Random(seed)
+    tables = list(table_info.items())
+    if not tables:
+        mix = {op: weight for op, weight in mix.items() if op in ("sample", "upload")}
+    if not mix:
+        return []
+
+    workload = []
+    for op in rng.choices(list(mix), weights=list(mix.values()), k=size):
+        if op == "upload":
+            workload.append({"op": "upload", "rows": 50})
+            continue
+        if op == "sample":
+            workload.append({"op": "sample", "count": 1})
+            continue
+
+        table, info = rng.choice(tables)
+        numeric_cols = info['numeric_columns']
+        categorical_cols = info['categorical_columns']
+        all_cols = numeric_cols + categorical_cols
+        if op == "nl":
+            if numeric_cols and categorical_cols:
+                question = rng.choice(["total {A} by {B}", "average {A} by {B}"]).format(
+                    A=rng.choice(numeric_cols), B=rng.choice(categorical_cols))
+            elif numeric_cols:
+                question = rng.choice(["maximum {A}", "minimum {A}", "sum of {A}"]).format(A=rng.choice(numeric_cols))
+            else:
+                question = "list all {A}".format(A=rng.choice(all_cols))
+            workload.append({"op": "nl", "question": question})
+        else:
+            sql = rng.choice([
+                f"SELECT * FROM {table} LIMIT 10",
+                f"SELECT COUNT(*) FROM {table}",
+                f"SELECT DISTINCT {rng.choice(all_cols)} FROM {table} LIMIT 10",
+            ])
+            workload.append({"op": "exec", "sql": sql})
+    return workload
+
+
+def run_operation(db, operation, user_id):
+    """Runs one workload operation, raising on failure."""
+    op = operation["op"]
+    results = []
+    if op == "nl":
+        sql_query = natural_language_to_sql(db, operation["question"])
+        if not sql_query.startswith("Sorry"):
+            results.append(db.execute_custom_query(sql_query, source="nl"))
+    elif op == "sample":
+        for query in db.generate_sample_queries(num_queries=operation.get("count", 1)):
+            results.append(db.execute_custom_query(query, source="sample"))
+    elif op == "exec":
+        results.append(db.execute_custom_query(operation["sql"]))
+    elif op == "upload":
+        headers = ["user_id", "seq", "payload"]
+        rows = [[user_id, i, f"row {i}"] for i in range(operation.get("rows", 50))]
+        results.append(db.create_table_and_insert_batches(f"loadtest_u{user_id}", headers, [rows]))
+    else:
+        raise ValueError(f"Unknown operation: {op}")
+
+    for result in results:
+        if "error" in result:
+            raise RuntimeError(result["error"])
+
+
+class LoadStats:
+    """Thread-safe collection of per-operation latencies and error counts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.error_messages = {}
+        self.connect_failures = 0
+
+    def record(self, op, latency_ms, error=None):
+        with self.lock:
+            self.latencies.setdefault(op, []).append(latency_ms)
+            if error is not None:
+                self.errors[op] = self.errors.get(op, 0) + 1
+                self._count_message(error)
+
+    def record_connect_failure(self, error):
+        """Counts a user that could not connect; kept out of the latency and throughput figures."""
+        with self.lock:
+            self.connect_failures += 1
+            self._count_message(error)
+
+    def _count_message(self, error):
+        message = str(error)
+        self.error_messages[message] = self.error_messages.get(message, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[index], 2)
+
+
+def histogram(values):
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for value in values:
+        counts[next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if value <= bound), len(LATENCY_BUCKETS_MS))] += 1
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def summarize(values, errors):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": round(values[-1], 2) if values else None,
+        "histogram": histogram(values)
+    }
+
+
+def simulated_user(user_id, config, database, workload, deadline, think_ms, stats):
+    """One analyst: owns a ChatDB connection and loops over the workload until the deadline."""
+    try:
+        db = ChatDB(config["host"], config["user"], config["password"], database,
+                    slow_query_ms=config["slow_query_ms"], explain_analyze=config["explain_analyze"])
+    except Exception as e:
+        stats.record_connect_failure(e)
+        return
+
+    index = user_id  # Stagger users so they don't all replay the same operation at once
+    try:
+        while time.perf_counter() < deadline:
+            operation = workload[index % len(workload)]
+            index += 1
+            started = time.perf_counter()
+            error = None
+            try:
+                run_operation(db, operation, user_id)
+            except Exception as e:
+                error = e
+            stats.record(operation["op"], (time.perf_counter() - started) * 1000, error)
+            if think_ms:
+                time.sleep(think_ms / 1000)
+    finally:
+        db.close()
+
+
+def run_level(config, database, workload, concurrency, duration, think_ms=0):
+    """Runs the workload with `concurrency` simulated users for `duration` seconds."""
+    stats = LoadStats()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=simulated_user, args=(user_id, config, database, workload, deadline, think_ms, stats))
+        for user_id in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in stats.latencies.values() for value in values]
+    total = summarize(all_latencies, sum(stats.errors.values()))
+    # Throughput counts successful operations only: fast failures under saturation are not work done
+    successful_ops = total["count"] - total["errors"]
+    total.update({
+        "concurrency": concurrency,
+        "connect_failures": stats.connect_failures,
+        "elapsed_s": round(elapsed, 2),
+        "successful_ops": successful_ops,
+        "throughput_ops": round(successful_ops / elapsed, 2),
+        "operations": {op: summarize(values, stats.errors.get(op, 0)) for op, values in stats.latencies.items()},
+        "top_errors": sorted(stats.error_messages.items(), key=lambda item: -item[1])[:5]
+    })
+    return total
+
+
+def saturation_point(levels):
+    """Returns the first concurrency level where successful throughput grew by less than 5% over the previous level."""
+    for previous, current in zip(levels, levels[1:]):
+        if current["throughput_ops"] < previous["throughput_ops"] * 1.05:
+            return current["concurrency"]
+    return None
+
+
+def print_report(levels):
+    row_format = "{:>11}  {:>8}  {:>10}  {:>9}  {:>9}  {:>9}  {:>7}  {:>9}"
+    print(row_format.format("concurrency", "ops", "ok_ops/s", "p50_ms", "p95_ms", "p99_ms", "errors", "conn_fail"))
+    for level in levels:
+        print(row_format.format(
+            level["concurrency"], level["count"], level["throughput_ops"],
+            *["-" if level[key] is None else round(level[key], 1) for key in ("p50_ms", "p95_ms", "p99_ms")],
+            f"{level['error_rate']:.1%}", level["connect_failures"]
+        ))
+    knee = saturation_point(levels)
+    if knee is not None:
+        print(f"\nThroughput stops scaling at {knee} concurrent users.")
+
+    last = levels[-1]
+    print(f"\nLatency histogram at {last['concurrency']} users:")
+    for bucket, count in last["histogram"].items():
+        print(f"  {bucket:>9}  {count}")
+    for message, count in last["top_errors"]:
+        print(f"  error x{count}: {message}")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        op, weight = part.split("=")
+        if op not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation in mix: {op}")
+        mix[op] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay ChatDB workloads with concurrent simulated users.")
+    parser.add_argument("--config", help="JSON config file (default: $CHATDB_CONFIG)")
+    parser.add_argument("--database", "-d", help="Database to load test (overrides config and $CHATDB_DATABASE)")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated numbers of simulated users")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run each concurrency level")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between a user's operations")
+    parser.add_argument("--workload", help="Recorded workload (JSON lines) to replay instead of a synthetic mix")
+    parser.add_argument("--save-workload", help="Write the synthetic workload to this file for later replay")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Synthetic mix, e.g. nl=0.4,sample=0.3,exec=0.25,upload=0.05")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--format", choices=["json", "text"], default="text")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    database = args.database or config["database"]
+    if not database:
+        print(json.dumps({"error": "No database given. Use --database, the config file or CHATDB_DATABASE."}))
+        return 2
+
+    # ChatDB prints progress for every query; keep the report readable
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if args.workload:
+            workload = load_workload(args.workload)
+        else:
+            db = ChatDB(config["host"], config["user"], config["password"], database)
+            workload = synthetic_workload(db.get_table_info(), args.mix, seed=args.seed)
+            db.close()
+            if args.save_workload:
+                with open(args.save_workload, "w") as file:
+                    file.writelines(json.dumps(operation) + "\n" for operation in workload)
+
+        if not workload:
+            print(json.dumps({"error": "The workload is empty."}), file=sys.stderr)
+            return 2
+
+        levels = [
+            run_level(config, database, workload, int(concurrency), args.duration, args.think_ms)
+            for concurrency in args.concurrency.split(",")
+        ]
+
+    if args.format == "json":
+        print(json.dumps({"levels": levels, "saturation_concurrency": saturation_point(levels)}))
+    else:
+        print_report(levels)
+    return 1 if any(level["count"] == 0 for level in levels) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import sqlite3
+import time
+
+from cache import DEFAULT_CACHE_DIR
+
+
+DEFAULT_LOG_PATH = os.path.join(DEFAULT_CACHE_DIR, "slow_queries.sqlite")
+
+# Statements whose plan is captured. Limited to reads: EXPLAIN ANALYZE executes the statement again
+EXPLAINABLE_QUERY = re.compile(r'\s*(SELECT|WITH|TABLE)\b', re.IGNORECASE)
+
+# Literals, quoted identifiers and comments, matched in one pass so that quoted text is never
+# mistaken for a comment (or the other way round)
+LITERAL_OR_COMMENT = re.compile(
+    r"(?P<literal>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|\b\d+(?:\.\d+)?\b)"
+    r"|(?P<identifier>`(?:[^`]|``)*`)"
+    r"|(?P<comment>/\*.*?\*/|--[^\n]*|#[^\n]*)",
+    re.DOTALL
+)
+
+
+def _replace_literal_or_comment(match):
+    if match.group("literal"):
+        return "?"
+    if match.group("identifier"):
+        return match.group("identifier")
+    return " "
+
+
+def fingerprint_query(query):
+    """Normalizes a query so that runs differing only in literal values share a fingerprint."""
+    query = LITERAL_OR_COMMENT.sub(_replace_literal_or_comment, query)
+    query = re.sub(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', 'IN (?+)', query, flags=re.IGNORECASE)
+    query = re.sub(r'\s+', ' ', query).strip().rstrip(';').strip()
+    return query.lower()
+
+
+def _rows_from_json_plan(node):
+    """Sums the optimizer's rows_examined_per_scan estimates over an EXPLAIN FORMAT=JSON plan."""
+    if isinstance(node, dict):
+        rows = node.get("rows_examined_per_scan", 0)
+        return rows + sum(_rows_from_json_plan(value) for value in node.values())
+    if isinstance(node, list):
+        return sum(_rows_from_json_plan(value) for value in node)
+    return 0
+
+
+def _rows_from_analyze_plan(plan):
+    """Sums actual rows * loops over the iterator tree printed by EXPLAIN ANALYZE."""
+    return int(sum(float(rows) * int(loops) for rows, loops in re.findall(r'actual time=\S+ rows=([\d.]+) loops=(\d+)', plan)))
+
+
+class SlowQueryLog:
+    """Captures plans for queries slower than a threshold and persists them in a SQLite log."""
+
+    def __init__(self, threshold_ms=0, path=None, analyze=False):
+        self.threshold_ms = threshold_ms
+        self.analyze = analyze
+        self.path = path or os.environ.get("CHATDB_SLOW_QUERY_LOG", DEFAULT_LOG_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS slow_queries (
+                logged_at REAL,
+                database_name TEXT,
+                source TEXT,
+                fingerprint TEXT,
+                query TEXT,
+                duration_ms REAL,
+                rows_examined INTEGER,
+                plan TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS slow_queries_fingerprint ON slow_queries (fingerprint)")
+        self.conn.commit()
+
+    def capture_plan(self, cursor, query, params=None):
+        """Runs EXPLAIN (or EXPLAIN ANALYZE, which re-executes the query) and returns (plan, rows_examined)."""
+        if not EXPLAINABLE_QUERY.match(query):
+            return None, None
+        if self.analyze:
+            cursor.execute(f"EXPLAIN ANALYZE {query}", params)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+            return plan, _rows_from_analyze_plan(plan)
+
+        cursor.execute(f"EXPLAIN FORMAT=JSON {query}", params)
+        row = cursor.fetchone()
+        if row is None:
+            return None, None
+        plan = row[0]
+        if isinstance(plan, bytes):
+            plan = plan.decode('utf-8')
+        return plan, _rows_from_json_plan(json.loads(plan))
+
+    def record(self, database, source, query, duration_ms, plan=None, rows_examined=None):
+        try:
+            self.conn.execute(
+                "INSERT INTO slow_queries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), database, source, fingerprint_query(query), query, duration_ms, rows_examined, plan)
+            )
+            self.conn.commit()
+        except sqlite3.Error as err:
+            print(f"Slow query log error: {err}")
+
+    def report(self, limit=20, database=None):
+        """Aggregates the log by fingerprint, most expensive (total duration) first."""
+        where = "WHERE database_name = ?" if database else ""
+        rows = self.conn.execute(f"""
+            SELECT fingerprint, COUNT(*), SUM(duration_ms), AVG(duration_ms), MAX(duration_ms),
+                   AVG(rows_examined), GROUP_CONCAT(DISTINCT source)
+            FROM slow_queries {where}
+            GROUP BY fingerprint
+            ORDER BY SUM(duration_ms) DESC
+            LIMIT ?
+        """, ((database,) if database else ()) + (limit,)).fetchall()
+
+        report = []
+        for fingerprint, count, total_ms, avg_ms, max_ms, avg_rows, sources in rows:
+            # Keep the query and plan of the slowest run as the example
+            query, plan = self.conn.execute(
+                f"SELECT query, plan FROM slow_queries WHERE fingerprint = ? {'AND database_name = ?' if database else ''} "
+                "ORDER BY duration_ms DESC LIMIT 1",
+                (fingerprint,) + ((database,) if database else ())
+            ).fetchone()
+            report.append({
+                "fingerprint": fingerprint,
+                "count": count,
+                "total_ms": round(total_ms, 2),
+                "avg_ms": round(avg_ms, 2),
+                "max_ms": round(max_ms, 2),
+                "avg_rows_examined": round(avg_rows) if avg_rows is not None else None,
+                "sources": sources.split(",") if sources else [],
+                "slowest_query": query,
+                "slowest_plan": plan
+            })
+        return report
+
+    def close(self):
+        self.conn.close()
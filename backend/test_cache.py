@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import unittest
+
+from cache import SchemaCache
+
+
+class SchemaCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = SchemaCache("localhost", "shop", self.cache_dir)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir)
+
+    def reopen(self):
+        self.cache.close()
+        self.cache = SchemaCache("localhost", "shop", self.cache_dir)
+
+    def test_entries_survive_reopen_with_same_fingerprint(self):
+        self.assertFalse(self.cache.validate("fp1"))
+        self.cache.set("table_info", {"sales": {"numeric_columns": ["qty"]}})
+        self.reopen()
+        self.assertTrue(self.cache.validate("fp1"))
+        self.assertEqual(self.cache.get("table_info"), {"sales": {"numeric_columns": ["qty"]}})
+
+    def test_fingerprint_mismatch_clears_entries(self):
+        self.cache.validate("fp1")
+        self.cache.set("table_info", {"sales": {}})
+        self.reopen()
+        self.assertFalse(self.cache.validate("fp2"))
+        self.assertIsNone(self.cache.get("table_info"))
+
+    def test_data_entries_expire_when_stamp_changes(self):
+        self.cache.validate("fp1", {"sales": "2024-01-01|10"})
+        self.cache.set_data("samples:sales.qty", "sales", [1, 2])
+        self.assertEqual(self.cache.get_data("samples:sales.qty", "sales", ttl=600), [1, 2])
+        self.cache.validate("fp1", {"sales": "2024-01-02|12"})
+        self.assertIsNone(self.cache.get_data("samples:sales.qty", "sales", ttl=600))
+
+    def test_data_entries_expire_after_ttl(self):
+        self.cache.validate("fp1", {"sales": "2024-01-01|10"})
+        self.cache.set_data("samples:sales.qty", "sales", [1, 2])
+        self.assertIsNone(self.cache.get_data("samples:sales.qty", "sales", ttl=-1))
+
+    def test_invalidate_drops_entries_and_fingerprint(self):
+        self.cache.validate("fp1")
+        self.cache.set("nl_index", {"sales": ["qty"]})
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.fingerprint)
+        self.assertIsNone(self.cache.get("nl_index"))
+        self.reopen()
+        self.assertFalse(self.cache.validate("fp1"))
+
+    def test_fingerprint_covers_columns_and_keys(self):
+        class FakeCursor:
+            def __init__(self, keys):
+                self.keys = keys
+
+            def execute(self, query, params=None):
+                self.query = query
+
+            def fetchall(self):
+                if "key_column_usage" in self.query:
+                    return self.keys
+                return [("sales", "id", b"int")]
+
+        without_key = SchemaCache.compute_fingerprint(FakeCursor([]), "shop")
+        with_key = SchemaCache.compute_fingerprint(FakeCursor([("sales", "PRIMARY", "id", None, None)]), "shop")
+        self.assertNotEqual(without_key, with_key)
+        self.assertEqual(without_key, SchemaCache.compute_fingerprint(FakeCursor([]), "shop"))
+
+
+if __name__ == "__main__":
+    unittest.main()
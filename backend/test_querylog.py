@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from querylog import fingerprint_query, SlowQueryLog
+
+
+class FingerprintQueryTest(unittest.TestCase):
+    def test_literals_are_replaced(self):
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM sales WHERE region = 'North' AND qty > 12.5 LIMIT 5;"),
+            "select * from sales where region = ? and qty > ? limit ?"
+        )
+
+    def test_same_template_shares_fingerprint(self):
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM t WHERE a = 'x' AND id IN (1, 2, 3)"),
+            fingerprint_query("select *  from t where a = \"y\" and id in (4)")
+        )
+
+    def test_comment_markers_inside_literals(self):
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM t WHERE name = '#1' AND x = 2"),
+            "select * from t where name = ? and x = ?"
+        )
+        self.assertEqual(
+            fingerprint_query("SELECT * FROM t WHERE a='--x' LIMIT 5"),
+            "select * from t where a=? limit ?"
+        )
+
+    def test_comments_are_removed(self):
+        self.assertEqual(
+            fingerprint_query("SELECT a /* 'quoted' */ FROM t -- trailing 'x'\nWHERE b = 1 # done"),
+            "select a from t where b = ?"
+        )
+
+    def test_quoted_identifiers_are_kept(self):
+        self.assertEqual(
+            fingerprint_query("SELECT `col#1` FROM `my table` WHERE `col#1` = 'v'"),
+            "select `col#1` from `my table` where `col#1` = ?"
+        )
+
+
+class SlowQueryLogReportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log = SlowQueryLog(path=os.path.join(self.tmp_dir, "slow.sqlite"))
+
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_report_aggregates_by_fingerprint(self):
+        self.log.record("shop", "sample", "SELECT * FROM t WHERE a = 'x'", 10.0, "{}", 100)
+        self.log.record("shop", "user", "SELECT * FROM t WHERE a = 'y'", 30.0, None, 50)
+        report = self.log.report()
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["count"], 2)
+        self.assertEqual(report[0]["total_ms"], 40.0)
+        self.assertEqual(report[0]["avg_rows_examined"], 75)
+        self.assertEqual(sorted(report[0]["sources"]), ["sample", "user"])
+        self.assertEqual(report[0]["slowest_query"], "SELECT * FROM t WHERE a = 'y'")
+
+    def test_slowest_example_comes_from_the_filtered_database(self):
+        self.log.record("shop", "user", "SELECT * FROM t WHERE a = 'shop'", 10.0, "shop plan")
+        self.log.record("other", "user", "SELECT * FROM t WHERE a = 'other'", 99.0, "other plan")
+        report = self.log.report(database="shop")
+        self.assertEqual(report[0]["slowest_query"], "SELECT * FROM t WHERE a = 'shop'")
+        self.assertEqual(report[0]["slowest_plan"], "shop plan")
+
+
+if __name__ == "__main__":
+    unittest.main()
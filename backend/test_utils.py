@@ -0,0 +1,72 @@
+import io
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from utils import parse_csv_parallel
+
+
+class ParseCsvParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content):
+        path = os.path.join(self.tmp_dir, "data.csv")
+        with open(path, "w", newline="") as file:
+            file.write(content)
+        return path
+
+    def parse(self, path, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            headers, batches = parse_csv_parallel(path, **kwargs)
+            rows = None if batches is None else [row for batch in batches for row in batch]
+        return headers, rows
+
+    def expected(self, path):
+        with open(path, newline="") as file:
+            rows = list(csv.reader(file))
+        return rows[0], rows[1:]
+
+    def test_split_points_inside_quoted_fields(self):
+        # Quoted fields with a newline every few bytes guarantee that split points land inside them
+        content = "id,note\n" + "".join(
+            f'{i},"a\nb\nc\nd\ne, ""quoted""\nf\ng\nh {i}"\n' if i % 3 == 0 else f"{i},plain {i}\n"
+            for i in range(200)
+        )
+        path = self.write(content)
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.parse(path, workers=workers, chunk_size=17), self.expected(path))
+
+    def test_header_with_embedded_newline(self):
+        path = self.write('id,"multi\nline header"\n1,a\n2,"b\nc\nd\ne\nf\ng\nh\ni\nj"\n3,d\n')
+        self.assertEqual(self.parse(path, workers=2, chunk_size=17), self.expected(path))
+
+    def test_unbalanced_quotes_fall_back_to_sequential_parsing(self):
+        path = self.write('a,b\n' + '1,"x\n2,3\n' * 50)
+        self.assertEqual(self.parse(path, workers=2, chunk_size=17), self.expected(path))
+
+    def test_unordered_returns_all_rows(self):
+        path = self.write("id,value\n" + "".join(f'{i},"v\n{i}"\n' for i in range(300)))
+        headers, rows = self.parse(path, workers=2, chunk_size=17, ordered=False)
+        expected_headers, expected_rows = self.expected(path)
+        self.assertEqual(headers, expected_headers)
+        self.assertEqual(sorted(rows), sorted(expected_rows))
+
+    def test_header_only_file(self):
+        path = self.write("a,b\n")
+        self.assertEqual(self.parse(path, workers=2, chunk_size=17), (["a", "b"], []))
+
+    def test_empty_file(self):
+        path = self.write("")
+        self.assertEqual(self.parse(path, workers=2, chunk_size=17), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
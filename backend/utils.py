@@ -1,8 +1,19 @@
 import csv
 import re
-import difflib
-import pandas as pd
+import io
+import os
+import mmap
+import queue
+import multiprocessing
+from collections import deque
+from itertools import islice
 
+# Target size of the byte ranges handed to each worker by parse_csv_parallel
+CSV_CHUNK_SIZE = 16 * 1024 * 1024
+# Parsed ranges allowed to wait for the consumer, per worker process
+CSV_IN_FLIGHT_PER_WORKER = 2
+# Batch size of the sequential fallback used for files with unbalanced quotes
+CSV_BATCH_ROWS = 50000
 
 
 def generate_description(query):
@@ -78,10 +89,12 @@ def generate_description(query):
     return description.strip() + "."
 
 def natural_language_to_sql(db, question):
+    import difflib  # Deferred so the CLI only pays for it when NL queries are used
+
     question = question.lower()
     
-    all_tables = db.get_all_tables()
-    table_columns = {table: db.get_table_columns(table) for table in all_tables}
+    table_columns = db.get_nl_index()
+    all_columns = sum(table_columns.values(), [])
     
     patterns = {
         "total {A} by {B}": "SELECT {B}, SUM({A}) FROM {table} GROUP BY {B}",
@@ -112,10 +125,10 @@ def natural_language_to_sql(db, question):
     for pattern, sql_template in patterns.items():
         if all(keyword in question for keyword in pattern.split() if keyword not in ['{A}', '{B}', '{C}', '{N}']):
             words = question.split()
-            A = next((find_best_match(word, sum(table_columns.values(), [])) for word in words 
-                      if any(difflib.SequenceMatcher(None, word, col).ratio() > 0.6 for col in sum(table_columns.values(), []))), None)
-            B = next((find_best_match(word, sum(table_columns.values(), [])) for word in reversed(words) 
-                      if word != A and any(difflib.SequenceMatcher(None, word, col).ratio() > 0.6 for col in sum(table_columns.values(), []))), None)
+            A = next((find_best_match(word, all_columns) for word in words 
+                      if any(difflib.SequenceMatcher(None, word, col).ratio() > 0.6 for col in all_columns)), None)
+            B = next((find_best_match(word, all_columns) for word in reversed(words) 
+                      if word != A and any(difflib.SequenceMatcher(None, word, col).ratio() > 0.6 for col in all_columns)), None)
             C = next((word for word in words if word not in pattern.split() and word != A and word != B), None)
             N = next((word for word in words if word.isdigit()), None)
             
@@ -128,6 +141,8 @@ def natural_language_to_sql(db, question):
     return "Sorry, I couldn't generate a SQL query for that question."
 
 def parse_excel(file_path):
+    import pandas as pd  # Deferred so the CLI only imports pandas for Excel uploads
+
     try:
         excel_data = pd.ExcelFile(file_path)
         sheets = {sheet: pd.read_excel(excel_data, sheet_name=sheet) for sheet in excel_data.sheet_names}
@@ -137,16 +152,126 @@ def parse_excel(file_path):
         print(f"Error parsing Excel file: {e}")
         return None
     
-def parse_csv(file_path):
-    """Parses the uploaded CSV file into headers and data rows."""
+def _count_quotes(task):
+    """Counts quote characters in a byte range of the file (worker for parse_csv_parallel)."""
+    file_path, start, end = task
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return sum(mm[pos:min(pos + CSV_CHUNK_SIZE, end)].count(b'"') for pos in range(start, end, CSV_CHUNK_SIZE))
+
+def _parse_csv_range(task):
+    """Parses the complete CSV records in a byte range of the file (worker for parse_csv_parallel)."""
+    file_path, start, end, encoding = task
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+    return [row for row in csv.reader(io.StringIO(text, newline=''))]
+
+def _iter_csv_batches(file_path, encoding, batch_rows=CSV_BATCH_ROWS):
+    """Streams the data rows of a CSV file sequentially in batches of batch_rows."""
+    with open(file_path, mode='r', encoding=encoding, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Skip the header
+        while True:
+            batch = list(islice(reader, batch_rows))
+            if not batch:
+                return
+            yield batch
+
+def parse_csv_parallel(file_path, workers=None, chunk_size=CSV_CHUNK_SIZE, ordered=True, encoding='utf-8'):
+    """Parses a large CSV file across a process pool.
+
+    The file is memory-mapped and split at newline offsets roughly chunk_size bytes apart.
+    Splits that fall inside a quoted field (odd number of quotes before them) are merged with
+    the following range; if the quotes in the file do not balance, parsing falls back to a
+    single sequential pass streamed in batches of CSV_BATCH_ROWS. Returns the headers and a
+    generator of row batches, in file order unless ordered=False. Only a bounded number of
+    ranges is in flight at once, so memory use does not grow with the file size.
+    """
     try:
-        with open(file_path, mode='r') as file:
-            reader = csv.reader(file)
-            headers = next(reader)  # First row is assumed to be the header
-            rows = [row for row in reader]  # Remaining rows are the data
-            print(f"CSV file parsed successfully. Columns: {headers}")
-            return headers, rows
+        with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+
+            # The header ends at the first newline that is not inside a quoted field
+            header_end = 0
+            while True:
+                newline = mm.find(b'\n', header_end)
+                header_end = size if newline == -1 else newline + 1
+                if header_end == size or mm[:header_end].count(b'"') % 2 == 0:
+                    break
+            headers = next(csv.reader(io.StringIO(mm[:header_end].decode(encoding), newline='')))
+
+            # Candidate split points: the first newline after every chunk_size bytes
+            boundaries = [header_end]
+            offset = header_end + chunk_size
+            while offset < size:
+                newline = mm.find(b'\n', offset)
+                if newline == -1:
+                    break
+                boundaries.append(newline + 1)
+                offset = newline + 1 + chunk_size
+            if boundaries[-1] < size:
+                boundaries.append(size)
+        ranges = list(zip(boundaries[:-1], boundaries[1:]))
     except Exception as e:
         print(f"Error parsing CSV file: {e}")
         return None, None
 
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+
+    def parse_batches():
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        try:
+            segments = ranges
+            if len(ranges) > 1:
+                # Re-synchronise on quotes: drop split points that land inside a quoted field
+                tasks = [(file_path, start, end) for start, end in ranges]
+                counts = pool.map(_count_quotes, tasks) if pool else map(_count_quotes, tasks)
+                segments = []
+                quotes = 0
+                for (start, end), count in zip(ranges, counts):
+                    if segments and quotes % 2:
+                        segments[-1] = (segments[-1][0], end)
+                    else:
+                        segments.append((start, end))
+                    quotes += count
+                if quotes % 2:
+                    print("Unbalanced quotes in CSV file, falling back to sequential parsing.")
+                    for batch in _iter_csv_batches(file_path, encoding):
+                        yield batch
+                    return
+
+            tasks = [(file_path, start, end, encoding) for start, end in segments]
+            if pool is None:
+                for batch in map(_parse_csv_range, tasks):
+                    yield batch
+                return
+
+            # Keep at most CSV_IN_FLIGHT_PER_WORKER * workers ranges submitted but not yet
+            # consumed, so a slow consumer (e.g. the MySQL loader) bounds memory use
+            tasks = iter(tasks)
+            pending = deque()
+            done = queue.Queue()
+            submit_kwargs = {} if ordered else {"callback": done.put, "error_callback": done.put}
+            for task in islice(tasks, CSV_IN_FLIGHT_PER_WORKER * workers):
+                pending.append(pool.apply_async(_parse_csv_range, (task,), **submit_kwargs))
+            while pending:
+                if ordered:
+                    batch = pending.popleft().get()
+                else:
+                    pending.pop()
+                    batch = done.get()
+                    if isinstance(batch, Exception):
+                        raise batch
+                for task in islice(tasks, 1):
+                    pending.append(pool.apply_async(_parse_csv_range, (task,), **submit_kwargs))
+                yield batch
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def batches():
+        for batch in parse_batches():
+            yield batch
+        print(f"CSV file parsed successfully. Columns: {headers}")
+
+    return headers, batches()